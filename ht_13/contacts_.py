@@ -2,28 +2,27 @@ import os
 import sys
 import time
 # from ipaddress import ip_address
-from typing import Callable
 
 import redis.asyncio as redis
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.responses import JSONResponse, ORJSONResponse
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from starlette.middleware.cors import CORSMiddleware
 from fastapi_limiter import FastAPILimiter
 
-
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(os.path.dirname(SCRIPT_DIR))
-
 from ht_13.src.database.database_ import get_db
 from ht_13.src.routes import contacts, auth, users
 from ht_13.src.conf.config import settings
 
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+redis_pool = redis.ConnectionPool(host=settings.redis_host, port=settings.redis_port,
+                                  db=0, encoding="utf-8", decode_responses=True,
+                                  max_connections=64)
 
 
 @app.on_event("startup")
@@ -35,9 +34,13 @@ async def startup():
     :return: The fastapilimiter instance
     :doc-author: Trelent
     """
-    red = await redis.Redis(host=settings.redis_host, port=settings.redis_port,
-                            db=0, encoding="utf-8", decode_responses=True)
-    await FastAPILimiter.init(red)
+    red = redis.Redis(connection_pool=redis_pool)
+    try:
+        await FastAPILimiter.init(red)
+    except redis.RedisError:
+        # The routes fall back to the in-process limiter; the app must still
+        # come up (and the test client must still start) without Redis.
+        pass
 
 origins = [
     "http://127.0.0.1:5500",
@@ -55,44 +58,64 @@ app.add_middleware(
 '''ALLOWED_IPS = [ip_address('192.168.1.0'), ip_address('172.16.0.0'), ip_address("127.0.0.1")]
 
 
-@app.middleware("http")
-async def limit_access_by_ip(request: Request, call_next: Callable):
-    """
-    The limit_access_by_ip function is a middleware function that limits access to the API by IP address.
-    It checks if the client's IP address is in ALLOWED_IPS, and if not, returns a 403 Forbidden response.
+class LimitAccessByIP:
+    """Pure ASGI middleware that rejects requests from IPs outside ALLOWED_IPS."""
 
-    :param request: Request: Access the request object
-    :param call_next: Callable: Pass the next function in the pipeline
-    :return: A jsonresponse object with a status code of 403
-    :doc-author: Trelent
-    """
-    ip = ip_address(request.client.host)
-    if ip not in ALLOWED_IPS:
-        return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not allowed IP address"})
-    response = await call_next(request)
-    return response'''
+    def __init__(self, app):
+        self.app = app
 
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        ip = ip_address(scope["client"][0])
+        if ip not in ALLOWED_IPS:
+            response = JSONResponse(status_code=status.HTTP_403_FORBIDDEN,
+                                    content={"detail": "Not allowed IP address"})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
 
-@app.middleware("http")
-async def custom_middleware(request: Request, call_next: Callable):
+
+app.add_middleware(LimitAccessByIP)'''
+
+
+class PerformanceMiddleware:
     """
-    The custom_middleware function is a middleware function that will be called before the request
-    is passed to the route handler. It will catch any SQLAlchemy errors and return them as JSON responses,
-    and it will add a performance header to every response.
+    Pure ASGI middleware that times each request and catches SQLAlchemy errors.
 
-    :param request: Request: Access the request object
-    :param call_next: Callable: Pass the request to the next middleware in line
-    :return: A response object
-    :doc-author: Trelent
+    Implemented as a raw ASGI callable instead of ``@app.middleware("http")``
+    because Starlette's BaseHTTPMiddleware spawns an extra task and anyio
+    streams per request, which costs a large share of throughput on the hot path.
+    The ``performance`` header is injected into the ``http.response.start``
+    message; SQLAlchemy errors are answered with a 400 JSON response.
     """
-    start = time.time()
-    try:
-        response = await call_next(request)
-    except SQLAlchemyError as error:
-        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"message": str(error)})
-    duration = time.time() - start
-    response.headers["performance"] = str(duration)
-    return response
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/live":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                duration = time.perf_counter() - start
+                message["headers"].append((b"performance", f"{duration:.6f}".encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except SQLAlchemyError as error:
+            response = JSONResponse(status_code=status.HTTP_400_BAD_REQUEST,
+                                    content={"message": str(error)})
+            await response(scope, receive, send)
+
+
+app.add_middleware(PerformanceMiddleware)
 
 
 @app.get("/")
@@ -107,6 +130,20 @@ async def root():
     return {"message": "Here your contacts!"}
 
 
+@app.get("/live")
+async def liveness():
+    """
+    The liveness function is a constant-time liveness probe with no dependencies.
+    It never touches the database or Redis, so load balancers can poll it at a
+    high frequency without consuming connections; use /api/healthchecker as the
+    readiness probe.
+
+    :return: A dictionary with the status
+    :doc-author: Trelent
+    """
+    return {"status": "ok"}
+
+
 @app.get("/api/healthchecker")
 def healthchecker(db: Session = Depends(get_db)):
     """
@@ -133,4 +170,18 @@ app.include_router(users.router, prefix="/api")
 
 
 if __name__ == '__main__':
-    uvicorn.run("contacts_:app", reload=True)
+    if sys.platform != "win32":
+        import uvloop
+        uvloop.install()
+    if settings.app_env == "dev":
+        uvicorn.run("contacts_:app", reload=True)
+    else:
+        # Production: one worker per core (or WEB_CONCURRENCY), uvloop +
+        # httptools, and no per-request access logging on the hot path.
+        uvicorn.run(
+            "ht_13.contacts_:app",
+            workers=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+            loop="uvloop",
+            http="httptools",
+            access_log=False,
+        )
@@ -0,0 +1,41 @@
+"""search birthday indexes
+
+Revision ID: 4b9e6a01d27c
+Revises: 8c5d1f7b2a94
+Create Date: 2026-08-29 11:37:02.482916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b9e6a01d27c'
+down_revision: Union[str, None] = '8c5d1f7b2a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_COLUMNS = ('first_name', 'last_name', 'email', 'phone_number', 'notes')
+
+
+def upgrade() -> None:
+    # Trigram indexes so the ILIKE '%...%' search does index scans instead of
+    # seq scans, and a month/day expression index for the birthdays window.
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in TRGM_COLUMNS:
+        op.execute(
+            f"CREATE INDEX ix_contacts_{column}_trgm ON contacts "
+            f"USING gin ({column} gin_trgm_ops)"
+        )
+    op.execute(
+        "CREATE INDEX ix_contacts_birth_month_day ON contacts "
+        "(EXTRACT(MONTH FROM birth_date), EXTRACT(DAY FROM birth_date))"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX ix_contacts_birth_month_day")
+    for column in TRGM_COLUMNS:
+        op.execute(f"DROP INDEX ix_contacts_{column}_trgm")
@@ -0,0 +1,28 @@
+"""unique users_contacts
+
+Revision ID: 8c5d1f7b2a94
+Revises: c33f74df7355
+Create Date: 2026-08-29 10:12:45.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c5d1f7b2a94'
+down_revision: Union[str, None] = 'c33f74df7355'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_unique_constraint('uq_users_contacts_user_contact', 'users_contacts', ['user_id', 'contact_id'])
+    op.create_index('ix_users_contacts_user_id', 'users_contacts', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_contacts_user_id', table_name='users_contacts')
+    op.drop_constraint('uq_users_contacts_user_contact', 'users_contacts', type_='unique')
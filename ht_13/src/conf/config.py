@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,6 +13,7 @@ class Settings(BaseSettings):
     secret_key_a: str = "secret"
     secret_key_r: str = "secret"
     algorithm: str = "HS256"
+    bcrypt_cost: int = 12
     mail_username: str = "example@meta.ua"
     mail_password: str = "password"
     mail_from: str = "example@meta.ua"
@@ -27,4 +30,17 @@ class Settings(BaseSettings):
         env_file_encoding="utf-8")
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """
+    The get_settings function returns the Settings instance, parsing the
+    environment/.env file only on the first call. Use Depends(get_settings)
+    in FastAPI code so tests can override it.
+
+    :return: The cached settings object
+    :doc-author: Trelent
+    """
+    return Settings()
+
+
+settings = get_settings()
@@ -0,0 +1,67 @@
+import time
+
+import redis.asyncio as redis
+
+from ht_13.src.conf.config import settings
+
+# One shared connection pool for every binary (non-decoding) async Redis
+# client in the app — the repositories, the auth path and the listing cache
+# all multiplex over these connections instead of each module growing its
+# own pool. It lives here, below both the repository and service layers, so
+# either side can import it without a cycle. The limiter pool in contacts_
+# stays separate because it needs decode_responses=True.
+redis_pool = redis.ConnectionPool(
+    host=settings.redis_host, port=settings.redis_port, db=0, max_connections=64
+)
+red = redis.Redis(connection_pool=redis_pool)
+
+# L1 user cache: a plain dict of email -> (user, deadline) in front of Redis.
+# Repeat requests within the TTL skip even the Redis round trip; the short
+# TTL bounds staleness across workers, with Redis as the shared L2. The
+# worker that performs a write drops its own entry through invalidate_l1,
+# so TTL-bounded staleness only applies to the other workers.
+_L1_TTL = 60
+_L1_MAXSIZE = 10_000
+_l1_users: dict[str, tuple[object, float]] = {}
+
+
+def get_l1_user(email: str):
+    """
+    The get_l1_user function returns the cached user for an email when its
+    deadline has not passed yet, or None on a miss.
+
+    :param email: str: Identify whose entry to read
+    :return: The cached user, or None
+    :doc-author: Trelent
+    """
+    entry = _l1_users.get(email)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+    return None
+
+
+def put_l1_user(email: str, user) -> None:
+    """
+    The put_l1_user function stores a user in the L1 cache with a fresh
+    deadline, evicting the oldest entry when the cache is full.
+
+    :param email: str: Identify whose entry to write
+    :param user: The user instance to cache
+    :return: None
+    :doc-author: Trelent
+    """
+    if len(_l1_users) >= _L1_MAXSIZE:
+        _l1_users.pop(next(iter(_l1_users)))
+    _l1_users[email] = (user, time.monotonic() + _L1_TTL)
+
+
+def invalidate_l1(email: str) -> None:
+    """
+    The invalidate_l1 function drops the L1 entry for an email, so the
+    worker that just committed a write never serves its own stale user.
+
+    :param email: str: Identify whose entry to drop
+    :return: None
+    :doc-author: Trelent
+    """
+    _l1_users.pop(email, None)
@@ -4,15 +4,34 @@ from pathlib import Path
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from fastapi import HTTPException, status
 
 from ht_13.src.conf.config import settings
 
 
 url = settings.sqlalchemy_database_url
+async_url = url.replace("postgresql+psycopg2", "postgresql+asyncpg")
 
-engine = create_engine(url, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(
+    url,
+    echo=settings.app_env == "dev",
+    pool_size=20,
+    max_overflow=40,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = create_async_engine(
+    async_url,
+    echo=settings.app_env == "dev",
+    pool_size=20,
+    max_overflow=40,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
 def get_db():
@@ -32,3 +51,20 @@ def get_db():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    The get_async_db function is the AsyncSession counterpart of get_db.
+    It yields a non-blocking session bound to the asyncpg engine, rolls back
+    on SQLAlchemy errors and closes the session when the request is done.
+
+    :return: An async database session
+    :doc-author: Trelent
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError as error:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import Column, Integer, String, Date, Boolean, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Boolean, Enum, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 
 
@@ -15,6 +15,10 @@ class Role(enum.Enum):
 
 class UserToContact(Base):
     __tablename__ = "users_contacts"
+    __table_args__ = (
+        UniqueConstraint("user_id", "contact_id", name="uq_users_contacts_user_contact"),
+        Index("ix_users_contacts_user_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -1,30 +1,51 @@
 from datetime import date, timedelta
-import logging
 
+from sqlalchemy import and_, bindparam, extract, insert, or_, select, tuple_
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from ht_13.src.database.models_ import Contact, User, UserToContact
 from ht_13.src.schemes.contacts import ContactModel
 
-logger = logging.getLogger(__name__)
+SEARCHABLE_COLUMNS = (
+    Contact.first_name,
+    Contact.last_name,
+    Contact.email,
+    Contact.phone_number,
+    Contact.notes,
+)
+
+# Built once at import time so every search reuses the same compiled statement.
+SEARCH_STMT = (
+    select(Contact)
+    .join(UserToContact, UserToContact.contact_id == Contact.id)
+    .where(
+        UserToContact.user_id == bindparam("user_id"),
+        or_(*(column.ilike(bindparam("pattern")) for column in SEARCHABLE_COLUMNS)),
+    )
+    .distinct()
+)
 
 
-async def get_contact_ids(user: User, db: Session) -> list[int]:
+def get_contact_ids(user: User, db: Session) -> list[int]:
     """
     The get_contact_ids function takes a user and database session as arguments.
-    It returns a list of contact ids associated with the given user.
+    It returns a list of contact ids associated with the given user. The
+    production queries join UserToContact directly, so this helper only
+    survives for the unit tests.
 
     :param user: User: Get the user's id
     :param db: Session: Pass the database session to the function
     :return: A list of contact_ids
     :doc-author: Trelent
     """
-    contact_ids = db.query(UserToContact.contact_id).filter_by(user_id=user.id).all()
-    return [cont.contact_id for cont in contact_ids]
+    contact_ids = db.execute(
+        select(UserToContact.contact_id).where(UserToContact.user_id == user.id)
+    ).scalars().all()
+    return contact_ids
 
 
-async def get_all(limit: int, offset: int, user: User, db: Session):
+def get_all(limit: int, offset: int, user: User, db: Session):
     """
     The get_all function returns a list of contacts for the user.
 
@@ -35,10 +56,10 @@ async def get_all(limit: int, offset: int, user: User, db: Session):
     :return: A list of contacts
     :doc-author: Trelent
     """
-    contact_ids = await get_contact_ids(user, db)
     contacts: list = (
         db.query(Contact)
-        .filter(Contact.id.in_(contact_ids))
+        .join(UserToContact, UserToContact.contact_id == Contact.id)
+        .filter(UserToContact.user_id == user.id)
         .limit(limit)
         .offset(offset)
         .all()
@@ -46,7 +67,7 @@ async def get_all(limit: int, offset: int, user: User, db: Session):
     return contacts
 
 
-async def get_contact_by_id(contact_id: int, user: User, db: Session):
+def get_contact_by_id(contact_id: int, user: User, db: Session):
     """
     The get_contact_by_id function returns a contact object from the database
         if it exists.
@@ -57,13 +78,16 @@ async def get_contact_by_id(contact_id: int, user: User, db: Session):
     :return: A contact object
     :doc-author: Trelent
     """
-    contact_ids = await get_contact_ids(user, db)
-    if contact_id in contact_ids:
-        contact = db.query(Contact).filter_by(id=contact_id).first()
-        return contact
+    contact = (
+        db.query(Contact)
+        .join(UserToContact, UserToContact.contact_id == Contact.id)
+        .filter(UserToContact.user_id == user.id, Contact.id == contact_id)
+        .first()
+    )
+    return contact
 
 
-async def create_record(contact_id: int, user: User, db: Session):
+def create_record(contact_id: int, user: User, db: Session):
     """
     The create_record function creates a new record in the UserToContact table.
         Args:
@@ -84,7 +108,28 @@ async def create_record(contact_id: int, user: User, db: Session):
     return record
 
 
-async def create_contact(body: ContactModel, user: User, db: Session):
+def bulk_create_records(user_id: int, contact_ids: list[int], db: Session):
+    """
+    The bulk_create_records function links many contacts to a user in one round trip.
+    It uses a Core insert with executemany instead of adding ORM objects one by one,
+    which is the fast path when importing many contacts at once.
+
+    :param user_id: int: Specify the user the contacts belong to
+    :param contact_ids: list[int]: The ids of the contacts to link
+    :param db: Session: Pass the database session to the function
+    :return: None
+    :doc-author: Trelent
+    """
+    if not contact_ids:
+        return
+    db.execute(
+        insert(UserToContact),
+        [{"user_id": user_id, "contact_id": contact_id} for contact_id in contact_ids],
+    )
+    db.commit()
+
+
+def create_contact(body: ContactModel, user: User, db: Session):
     """
     The create_contact function creates a new contact in the database.
         It takes in a ContactModel object, which is validated by pydantic and then converted into an SQLAlchemy model.
@@ -99,17 +144,17 @@ async def create_contact(body: ContactModel, user: User, db: Session):
     contact = Contact(**body.model_dump())
     try:
         db.add(contact)
+        db.flush()
+        db.add(UserToContact(user_id=user.id, contact_id=contact.id))
         db.commit()
-        db.refresh(contact)
-        await create_record(contact.id, user, db)
         return contact
     except IntegrityError as err:
         db.rollback()
         print(err)
-        await check(contact, user, db)
+        check(contact, user, db)
 
 
-async def check(contact: Contact, user: User, db):
+def check(contact: Contact, user: User, db):
     """
     The check function is used to check if a contact already exists in the database.
     If it does, then we create a record for that user and contact in the UserToContact table.
@@ -123,12 +168,14 @@ async def check(contact: Contact, user: User, db):
     existing_contact = (
         db.query(Contact).filter_by(phone_number=contact.phone_number).first()
     )
-    user_contacts = db.query(UserToContact.contact_id).filter_by(user_id=user.id).all()
-    if existing_contact and existing_contact.id not in [cont.contact_id for cont in user_contacts]:
-        await create_record(existing_contact.id, user, db)
+    if existing_contact:
+        try:
+            create_record(existing_contact.id, user, db)
+        except IntegrityError:
+            db.rollback()
 
 
-async def update(contact_id: int, body: ContactModel, user: User, db: Session):
+def update(contact_id: int, body: ContactModel, user: User, db: Session):
     """
     The update function updates a contact in the database.
         Args:
@@ -142,7 +189,7 @@ async def update(contact_id: int, body: ContactModel, user: User, db: Session):
     :return: The contact object
     :doc-author: Trelent
     """
-    contact = await get_contact_by_id(contact_id, user, db)
+    contact = get_contact_by_id(contact_id, user, db)
     if contact:
         contact.first_name = body.first_name
         contact.last_name = body.last_name
@@ -151,11 +198,10 @@ async def update(contact_id: int, body: ContactModel, user: User, db: Session):
         contact.birth_date = body.birth_date
         contact.notes = body.notes
         db.commit()
-        db.refresh(contact)
     return contact
 
 
-async def remove(contact_id: int, user: User, db: Session):
+def remove(contact_id: int, user: User, db: Session):
     """
     The remove function removes a contact from the database.
         Args:
@@ -170,19 +216,19 @@ async def remove(contact_id: int, user: User, db: Session):
     :return: The contact object that was removed
     :doc-author: Trelent
     """
-    contact = await get_contact_by_id(contact_id, user, db)
+    contact = get_contact_by_id(contact_id, user, db)
     if contact:
         db.delete(contact)
         db.commit()
     return contact
 
 
-async def search(parameter: str | int, user: User, db: Session):
+def search(parameter: str | int, user: User, db: Session):
     """
     The search function is used to search for contacts in the database.
-    It takes a parameter, which can be either a string or an integer, and searches through all of the attributes
-    of Contact objects in the database.
-    The function returns a list of Contact objects that match any attribute with the given parameter.
+    It takes a parameter, which can be either a string or an integer, and matches it
+    against every searchable column of the user's contacts in a single query.
+    The function returns a list of Contact objects that match any column with the given parameter.
 
     :param parameter: str | int: Search for a contact in the database
     :param user: User: Get the user's contact list
@@ -190,32 +236,22 @@ async def search(parameter: str | int, user: User, db: Session):
     :return: A list of contacts, which match the search parameter
     :doc-author: Trelent
     """
-    attributes: list[str] = list(vars(Contact).keys())
-    result = []
-    contact_ids = await get_contact_ids(user, db)
-    for attribute in attributes:
-        try:
-            query = (
-                db.query(Contact)
-                .filter(
-                    Contact.id.in_(contact_ids),
-                    getattr(Contact, attribute).ilike("%" + parameter + "%")
-                    if attribute != "id"
-                    else None,
-                )
-                .all()
-            )
-        except Exception as error:
-            logger.error(f"Error during proceeding SQL-query: {str(error)}")
-            continue
-        if query:
-            result.extend([rec for rec in query if rec not in result])
-    return result
-
-
-async def birthdays(user: User, db: Session):
+    pattern = f"%{parameter}%"
+    contacts = (
+        db.execute(SEARCH_STMT, {"user_id": user.id, "pattern": pattern})
+        .scalars()
+        .all()
+    )
+    return contacts
+
+
+def birthdays(user: User, db: Session):
     """
     The birthdays function returns a list of contacts whose birthdays are within the next 7 days.
+    The month/day window is evaluated in SQL as a row comparison on
+    (EXTRACT(MONTH), EXTRACT(DAY)) — the same expression pair the
+    ix_contacts_birth_month_day index is built on, so Postgres can answer
+    with an index scan instead of computing a string per row.
 
     :param user: User: Get the user id from the request
     :param db: Session: Pass the database session to the function
@@ -223,19 +259,24 @@ async def birthdays(user: User, db: Session):
     :doc-author: Trelent
     """
     current_date = date.today()
-    dates: list = [current_date + timedelta(days=i) for i in range(7)]
-    result = []
-    contacts = [
-        contact
-        for contact in await get_all(limit=100, offset=0, user=user, db=db)
-        if contact.birth_date
-    ]
-    for contact in contacts:
-        b_date = date(
-            year=current_date.year,
-            month=contact.birth_date.month,
-            day=contact.birth_date.day,
+    end_date = current_date + timedelta(days=6)
+    month_day = tuple_(
+        extract("month", Contact.birth_date), extract("day", Contact.birth_date)
+    )
+    start = (current_date.month, current_date.day)
+    end = (end_date.month, end_date.day)
+    if start <= end:
+        window = and_(month_day >= start, month_day <= end)
+    else:  # the 7-day window wraps over the new year
+        window = or_(month_day >= start, month_day <= end)
+    contacts = (
+        db.query(Contact)
+        .join(UserToContact, UserToContact.contact_id == Contact.id)
+        .filter(
+            UserToContact.user_id == user.id,
+            Contact.birth_date.isnot(None),
+            window,
         )
-        if b_date in dates:
-            result.append(contact)
-    return result
+        .all()
+    )
+    return contacts
@@ -1,80 +1,194 @@
-from sqlalchemy.orm import Session
-from libgravatar import Gravatar
+import asyncio
+import hashlib
+import pickle
 
+import redis.asyncio as redis
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ht_13.src.database.cache import invalidate_l1, red
 from ht_13.src.database.models_ import User
 from ht_13.src.schemes.users import UserModel
 
+USER_CACHE_TTL = 900
+
+# In-flight lookups keyed by email so concurrent requests in the same event
+# loop share one SELECT instead of issuing N identical ones.
+_inflight: dict[str, asyncio.Future] = {}
+
 
-async def get_user_by_email(email: str, db: Session) -> User | None:
+async def invalidate_user_cache(email: str):
+    """
+    The invalidate_user_cache function drops the cached user for an email:
+    this process's L1 entry, the repository's pickled Redis entry and the
+    auth path's orjson Redis entry. Every mutator calls it after commit so
+    the next lookup sees fresh data — at least on the worker that wrote;
+    other workers' L1 entries age out within their TTL.
+
+    :param email: str: Identify whose cache entries to drop
+    :return: None
+    :doc-author: Trelent
+    """
+    invalidate_l1(email)
+    try:
+        await red.delete(f"user:{email}", f"auth_user:{email}")
+    except redis.RedisError:
+        pass
+
+
+async def get_user_by_email(email: str, db: AsyncSession) -> User | None:
     """
     The get_user_by_email function takes in an email and a database session,
     and returns the user with that email if it exists. If no such user exists,
-    it returns None.
+    it returns None. Lookups are served from a short-TTL Redis cache when
+    possible — this SELECT runs on every authenticated request — and fall back
+    to the database when Redis is unavailable. The contacts relationship is
+    eagerly loaded so the user can be serialized without lazy-load round trips.
 
     :param email: str: Pass the email address of a user to the function
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :return: A user object if the user exists, or none if it doesn't
     :doc-author: Trelent
     """
-    return db.query(User).filter_by(email=email).first()
+    key = f"user:{email}"
+    try:
+        cached = await red.get(key)
+    except redis.RedisError:
+        cached = None
+    if cached is not None:
+        return pickle.loads(cached)
+    pending = _inflight.get(email)
+    if pending is not None:
+        return await pending
+    future = asyncio.get_running_loop().create_future()
+    _inflight[email] = future
+    try:
+        result = await db.execute(
+            select(User).options(selectinload(User.contacts)).where(User.email == email)
+        )
+        user = result.scalar_one_or_none()
+    except BaseException as error:
+        future.set_exception(error)
+        future.exception()  # mark retrieved for waiters-free futures
+        raise
+    else:
+        future.set_result(user)
+    finally:
+        _inflight.pop(email, None)
+    if user is not None:
+        try:
+            await red.set(key, pickle.dumps(user), ex=USER_CACHE_TTL)
+        except redis.RedisError:
+            pass
+    return user
 
 
-async def create_user(body: UserModel, db: Session):
+async def email_exists(email: str, db: AsyncSession) -> bool:
+    """
+    The email_exists function checks whether a user with the given email is
+    already registered. It selects only the id with LIMIT 1, so Postgres can
+    answer from the unique index on users.email without fetching the row.
+
+    :param email: str: The email address to check
+    :param db: AsyncSession: Pass the database session to the function
+    :return: True if a user with this email exists
+    :doc-author: Trelent
+    """
+    user_id = await db.scalar(select(User.id).where(User.email == email).limit(1))
+    return user_id is not None
+
+
+async def create_user(body: UserModel, db: AsyncSession):
     """
     The create_user function creates a new user in the database.
+    The avatar URL is computed locally from the email hash, so signup never
+    waits on a Gravatar HTTP call; the confirmation email is already queued
+    through BackgroundTasks by the signup route.
         Args:
             body (UserModel): The UserModel object to be created.
-            db (Session): The SQLAlchemy session object used for querying the database.
+            db (AsyncSession): The SQLAlchemy session object used for querying the database.
 
     :param body: UserModel: Pass the user data to the function
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :return: A user object
     :doc-author: Trelent
     """
-    gr = Gravatar(body.email)
-    avatar = gr.get_image()
-    new_user = User(**body.model_dump(), avatar=avatar)
+    email_hash = hashlib.md5(body.email.strip().lower().encode()).hexdigest()
+    avatar = f"https://www.gravatar.com/avatar/{email_hash}"
+    new_user = User(**body.model_dump(), avatar=avatar, contacts=[])
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await invalidate_user_cache(body.email)
     return new_user
 
 
-async def update_token(user: User, refresh_token, db: Session):
+async def update_token(user: User, refresh_token, db: AsyncSession):
     """
     The update_token function updates the refresh token for a user in the database.
-        Args:
-            user (User): The User object to update.
-            refresh_token (str): The new refresh token to store in the database.
-            db (Session): A connection to our Postgres database.
+    The write goes through an UPDATE keyed on the user id, so it works the same
+    whether the user instance came from the session or from the Redis cache.
 
     :param user: User: Identify the user that is being updated
     :param refresh_token: Update the user's refresh_token in the database
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :return: A user object
     :doc-author: Trelent
     """
+    await db.execute(
+        update(User).where(User.id == user.id).values(refresh_token=refresh_token)
+    )
+    await db.commit()
     user.refresh_token = refresh_token
-    db.commit()
+    await invalidate_user_cache(user.email)
 
 
-async def confirm_email(email: str, db: Session):
+async def rotate_refresh_token(email: str, old_token: str, new_token: str, db: AsyncSession) -> bool:
     """
-    The confirm_email function takes an email and a database session as arguments.
-    It then uses the get_user_by_email function to retrieve the user with that email address,
-    and sets their confirmed field to True. It then commits this change to the database.
-
-    :param email: str: Get the email of the user
-    :param db: Session: Access the database
+    The rotate_refresh_token function swaps the stored refresh token for a new
+    one in a single conditional UPDATE keyed on (email, old token). The check
+    and the write happen atomically in the database, so concurrent refresh
+    attempts with the same token cannot both win — the row lock taken by the
+    first UPDATE makes the second one match zero rows.
+
+    :param email: str: Identify the user whose token is rotated
+    :param old_token: str: The refresh token presented by the client
+    :param new_token: str: The replacement refresh token
+    :param db: AsyncSession: Pass the database session to the function
+    :return: True when the swap happened, False when the old token was stale
+    :doc-author: Trelent
+    """
+    result = await db.execute(
+        update(User)
+        .where(User.email == email, User.refresh_token == old_token)
+        .values(refresh_token=new_token)
+        .returning(User.id)
+    )
+    await db.commit()
+    await invalidate_user_cache(email)
+    return result.scalar_one_or_none() is not None
+
+
+async def confirm_email(user: User, db: AsyncSession):
+    """
+    The confirm_email function takes an already-fetched user and a database
+    session as arguments. It sets the confirmed field to True with a single
+    UPDATE and commits this change to the database — the route has already
+    loaded the user for the "already confirmed" check, so no second SELECT
+    is issued.
+
+    :param user: User: The user whose email is being confirmed
+    :param db: AsyncSession: Access the database
     :return: Nothing, so the return type is none
     :doc-author: Trelent
     """
-    user = await get_user_by_email(email, db)
+    await db.execute(update(User).where(User.id == user.id).values(confirmed=True))
+    await db.commit()
     user.confirmed = True
-    db.commit()
+    await invalidate_user_cache(user.email)
 
 
-async def reset_password(user: User, new_password: str, db: Session):
+async def reset_password(user: User, new_password: str, db: AsyncSession):
     """
     The reset_password function takes a user and new_password as arguments,
     and updates the password of the user in the database.
@@ -82,25 +196,29 @@ async def reset_password(user: User, new_password: str, db: Session):
 
     :param user: User: Get the user object from the database
     :param new_password: str: Pass in the new password
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: Nothing
     :doc-author: Trelent
     """
+    await db.execute(
+        update(User).where(User.id == user.id).values(password=new_password)
+    )
+    await db.commit()
     user.password = new_password
-    db.commit()
+    await invalidate_user_cache(user.email)
 
 
-async def update_avatar(email: str, url: str, db: Session):
+async def update_avatar(email: str, url: str, db: AsyncSession):
     """
     The update_avatar function updates the avatar of a user.
 
     :param email: str: Specify the email of the user that is being updated
     :param url: str: Update the avatar of a user
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: The user object
     :doc-author: Trelent
     """
-    user = await get_user_by_email(email, db)
-    user.avatar = url
-    db.commit()
-    return user
+    await db.execute(update(User).where(User.email == email).values(avatar=url))
+    await db.commit()
+    await invalidate_user_cache(email)
+    return await get_user_by_email(email, db)
@@ -4,12 +4,13 @@ from fastapi.security import (
     HTTPBearer,
     OAuth2PasswordRequestForm,
 )
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_limiter.depends import RateLimiter
 
-from ht_13.src.database.database_ import get_db
+from ht_13.src.database.database_ import get_async_db
 from ht_13.src.repository import users as repository_users
-from ht_13.src.schemes.users import UserModel, UserResponse, TokenModel
+from ht_13.src.schemes.users import UserModel, UserResponse
 from ht_13.src.schemes.email import RequestEmail, PasswordResetModel
 from ht_13.src.services.auth import auth_token, auth_password
 from ht_13.src.services.email import send_email
@@ -22,7 +23,7 @@ security = HTTPBearer()
 
 @router.post("/signup", response_model=UserResponse,  # dependencies=[Depends(RateLimiter(times=3, seconds=60))],
              status_code=status.HTTP_201_CREATED, description="For all. No more than 3 attempts to register per minute.")
-async def signup(body: UserModel, background_task: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+async def signup(body: UserModel, background_task: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     The signup function creates a new user in the database.
         It takes in a UserModel object, which is validated by pydantic.
@@ -35,17 +36,16 @@ async def signup(body: UserModel, background_task: BackgroundTasks, request: Req
     :return: A user object, which is then serialized and returned as a response
     :doc-author: Trelent
     """
-    exist_user = await repository_users.get_user_by_email(body.email, db)
-    if exist_user:
+    if await repository_users.email_exists(body.email, db):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_password.get_password_hash(body.password)
+    body.password = await auth_password.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
     background_task.add_task(send_email, new_user.email, new_user.username, str(request.base_url))
     return new_user
 
 
-@router.post("/login", response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+@router.post("/login")
+async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """
     The login function is used to authenticate a user.
         It takes the email and password of the user, verifies them against
@@ -61,21 +61,27 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_EMAIL)
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.EMAIL_NOT_CONFIRMED)
-    if not auth_password.verify_password(body.password, user.password):
+    if not await auth_password.verify_password(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_PASSWORD)
     # generate JWT
     access_token = await auth_token.create_access_token(data={"sub": user.email})
     refresh_token_ = await auth_token.create_refresh_token(data={"sub": user.email})
     await repository_users.update_token(user, refresh_token_, db)
-    return {"access_token": access_token, "refresh_token": refresh_token_, "token_type": messages.TOKEN_TYPE}
+    # The tokens are already plain strings, so serialize directly instead of
+    # paying for a second validation pass through response_model=TokenModel.
+    return ORJSONResponse(
+        {"access_token": access_token, "refresh_token": refresh_token_, "token_type": messages.TOKEN_TYPE}
+    )
 
 
-@router.get("/refresh_token", response_model=TokenModel)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+@router.get("/refresh_token")
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: AsyncSession = Depends(get_async_db)):
     """
     The refresh_token function is used to refresh the access token.
         The function will check if the user has a valid refresh token and then create a new access token for them.
         If they do not have a valid refresh_token, it will return an error.
+        The check-and-swap runs as one conditional UPDATE, so a concurrent
+        retry with the same token cannot rotate twice and strand the client.
 
     :param credentials: HTTPAuthorizationCredentials: Get the credentials from the request header
     :param db: Session: Pass the database session to the function
@@ -84,23 +90,18 @@ async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(sec
     """
     token = credentials.credentials
     email = await auth_token.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
     access_token = await auth_token.create_access_token(data={"sub": email})
-    refresh_token_ = await auth_token.create_refresh_token(data={"sub": user.email})
-    await repository_users.update_token(user, refresh_token_, db)
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token_,
-        "token_type": "bearer",
-    }
+    refresh_token_ = await auth_token.create_refresh_token(data={"sub": email})
+    if not await repository_users.rotate_refresh_token(email, token, refresh_token_, db):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    return ORJSONResponse(
+        {"access_token": access_token, "refresh_token": refresh_token_, "token_type": messages.TOKEN_TYPE}
+    )
 
 
 @router.get('/confirmed_email/{token}')
-async def confirmed_email(token: str, db: Session = Depends(get_db)):  # !!!
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_async_db)):  # !!!
     """
     The confirmed_email function is used to confirm a user's email address.
     It takes the token from the URL and uses it to get the user's email address.
@@ -120,13 +121,13 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):  # !!!
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Verification error")
     if user.confirmed:
         return {"message": "Your email is already confirmed"}
-    await repository_users.confirm_email(email, db)
+    await repository_users.confirm_email(user, db)
     return {"message": "Email confirmed"}
 
 
 @router.post('/request_email')
 async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,  # !!!
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_async_db)):
     """
     The request_email function is used to send an email the user with a link that will confirm their email address.
     The function takes in a RequestEmail object, which contains the user's email address. The function then checks if
@@ -150,7 +151,7 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
 
 
 @router.post('/reset_password')
-async def reset_password(body: PasswordResetModel, db: Session = Depends(get_db)):
+async def reset_password(body: PasswordResetModel, db: AsyncSession = Depends(get_async_db)):
     """
     The reset_password function is used to reset a user's password.
         It takes in the email of the user and their new password, which must be confirmed by entering it again.
@@ -167,6 +168,6 @@ async def reset_password(body: PasswordResetModel, db: Session = Depends(get_db)
     if body.new_password != body.confirm_password:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail="New password does not equal to password from field 'Confirm password'")
-    new_password = auth_password.get_password_hash(body.new_password)
+    new_password = await auth_password.get_password_hash(body.new_password)
     await repository_users.reset_password(user, new_password, db)
     return {"message": "Password reset complete!"}
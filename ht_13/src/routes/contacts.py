@@ -1,40 +1,99 @@
-from typing import List
+import hashlib
 # from datetime import date
 
-from fastapi import Depends, HTTPException, Path, Query, APIRouter, status
+from fastapi import Depends, HTTPException, Path, Query, APIRouter, Request, Response, status
 from sqlalchemy.orm import Session
-from fastapi_limiter.depends import RateLimiter
+from starlette.concurrency import run_in_threadpool
+import redis.asyncio as redis
 
+from ht_13.src.database.cache import red
 from ht_13.src.database.database_ import get_db
 from ht_13.src.repository import contacts as repository_contacts
-from ht_13.src.schemes.contacts import ContactModel, ContactResponse
-from ht_13.src.database.models_ import User, Role
-from ht_13.src.services.auth import auth_user
-from ht_13.src.services.roles import RoleAccess
+from ht_13.src.schemes.contacts import (
+    CONTACT_ADAPTER,
+    CONTACT_LIST_ADAPTER,
+    ContactModel,
+)
+from ht_13.src.database.models_ import User
+from ht_13.src.services.rate_limit import LocalRateLimiter
+from ht_13.src.services.roles import admin_only, allow_all, moderators_and_admin
 
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
-allowed_get = RoleAccess([Role.admin, Role.moderator, Role.user])
-allowed_create = RoleAccess([Role.admin, Role.moderator, Role.user])
-allowed_update = RoleAccess([Role.admin, Role.moderator])
-allowed_remove = RoleAccess([Role.admin])
-allowed_search = RoleAccess([Role.admin, Role.moderator, Role.user])
-allowed_get_birthdays = RoleAccess([Role.admin, Role.moderator, Role.user])
+LISTING_CACHE_TTL = 10
 
 
-@router.get("/", response_model=List[ContactResponse],
-            dependencies=[Depends(allowed_get), Depends(RateLimiter(times=10, seconds=60))],
+async def _contacts_version(user_id: int) -> int:
+    """
+    The _contacts_version function returns the per-user contacts version
+    counter. The counter is folded into listing cache keys, so bumping it
+    invalidates every cached page for that user without scanning Redis.
+
+    :param user_id: int: Identify whose counter to read
+    :return: The current version, 0 when Redis is unavailable
+    :doc-author: Trelent
+    """
+    try:
+        version = await red.get(f"contacts_ver:{user_id}")
+    except redis.RedisError:
+        return 0
+    return int(version) if version else 0
+
+
+async def _bump_contacts_version(user_id: int):
+    """
+    The _bump_contacts_version function increments the per-user contacts
+    version counter after a mutation, orphaning all cached listings for
+    that user. They expire on their own short TTL.
+
+    :param user_id: int: Identify whose counter to bump
+    :return: None
+    :doc-author: Trelent
+    """
+    try:
+        await red.incr(f"contacts_ver:{user_id}")
+    except redis.RedisError:
+        pass
+
+
+def _contact_response(contact, status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    The _contact_response function serializes a single contact through the
+    precompiled module-level TypeAdapter, bypassing response_model's extra
+    encode+validate round trip.
+
+    :param contact: The ORM contact to serialize
+    :param status_code: int: Status code for the response
+    :return: A JSON response with the serialized contact
+    :doc-author: Trelent
+    """
+    payload = CONTACT_ADAPTER.dump_json(
+        CONTACT_ADAPTER.validate_python(contact, from_attributes=True)
+    )
+    return Response(content=payload, media_type="application/json", status_code=status_code)
+
+
+@router.get("/",
+            dependencies=[Depends(LocalRateLimiter(times=10, seconds=60))],
             description="For all. No more than 10 requests per minute.")
 async def get_contacts(
+        request: Request,
         limit: int = Query(10, le=100),
         offset: int = 0,
         db: Session = Depends(get_db),
-        current_user: User = Depends(auth_user.get_current_user)
+        current_user: User = Depends(allow_all)
 ):
     """
-    The get_contacts function returns a list of contacts.
+    The get_contacts function returns a list of contacts. The rows are
+    validated and serialized in one pydantic-core pass through the module
+    level TypeAdapter instead of going through response_model, which would
+    encode and re-validate every row. Serialized pages are kept in a
+    short-TTL Redis cache keyed by (user, version, limit, offset), so the
+    rate-limited listing traffic costs about one SELECT per TTL window,
+    and an ETag lets clients revalidate with a 304 instead of a full body.
 
+    :param request: Request: Read the If-None-Match header
     :param limit: int: Limit the number of contacts returned
     :param offset: int: Specify the number of records to skip
     :param db: Session: Pass a database session to the function
@@ -42,16 +101,38 @@ async def get_contacts(
     :return: A list of contacts
     :doc-author: Trelent
     """
-    contacts = await repository_contacts.get_all(limit, offset, current_user, db)
-    return contacts
+    version = await _contacts_version(current_user.id)
+    key = f"contacts:{current_user.id}:{version}:{limit}:{offset}"
+    try:
+        payload = await red.get(key)
+    except redis.RedisError:
+        payload = None
+    if payload is None:
+        # The contacts repository runs on the sync engine; push its blocking
+        # I/O onto the threadpool so the event loop keeps serving requests.
+        contacts = await run_in_threadpool(
+            repository_contacts.get_all, limit, offset, current_user, db
+        )
+        payload = CONTACT_LIST_ADAPTER.dump_json(
+            CONTACT_LIST_ADAPTER.validate_python(contacts, from_attributes=True)
+        )
+        try:
+            await red.set(key, payload, ex=LISTING_CACHE_TTL)
+        except redis.RedisError:
+            pass
+    etag = f'"{hashlib.md5(payload).hexdigest()}"'
+    headers = {"Cache-Control": "private, max-age=5", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
 
 
-@router.get("/{contact_id}", response_model=ContactResponse,
-            dependencies=[Depends(allowed_get), Depends(RateLimiter(times=10, seconds=60))],
+@router.get("/{contact_id}",
+            dependencies=[Depends(LocalRateLimiter(times=10, seconds=60))],
             description="For all. No more than 10 requests per minute."
             )
 async def get_contact(contact_id: int = Path(ge=1),
-                      current_user: User = Depends(auth_user.get_current_user),
+                      current_user: User = Depends(allow_all),
                       db: Session = Depends(get_db)):
     """
     The get_contact function is a GET request that returns the contact with the given ID.
@@ -64,19 +145,21 @@ async def get_contact(contact_id: int = Path(ge=1),
     :return: A contact object
     :doc-author: Trelent
     """
-    contact = await repository_contacts.get_contact_by_id(contact_id, current_user, db)
+    contact = await run_in_threadpool(
+        repository_contacts.get_contact_by_id, contact_id, current_user, db
+    )
     if not contact:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
-    return contact
+    return _contact_response(contact)
 
 
-@router.post("/", response_model=ContactResponse,
+@router.post("/",
              status_code=status.HTTP_201_CREATED,
-             dependencies=[Depends(allowed_create), Depends(RateLimiter(times=4, seconds=60))],
+             dependencies=[Depends(LocalRateLimiter(times=4, seconds=60))],
              description="For all. No more than 4 creations per minute."
              )
 async def create_contact(body: ContactModel,
-                         current_user: User = Depends(auth_user.get_current_user),
+                         current_user: User = Depends(allow_all),
                          db: Session = Depends(get_db)):
     """
     The create_contact function creates a new contact in the database.
@@ -89,20 +172,22 @@ async def create_contact(body: ContactModel,
     :return: A contactmodel object
     :doc-author: Trelent
     """
-    contact = await repository_contacts.create_contact(body, current_user, db)
+    contact = await run_in_threadpool(
+        repository_contacts.create_contact, body, current_user, db
+    )
     if contact is None:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Such contact already exists")
-    return contact
+    await _bump_contacts_version(current_user.id)
+    return _contact_response(contact, status_code=status.HTTP_201_CREATED)
 
 
-@router.put("/{contact_id}", response_model=ContactResponse,
-            dependencies=[Depends(allowed_update)],
+@router.put("/{contact_id}",
             description="For moderators and admin"
             )
 async def update_contact(
         body: ContactModel,
         contact_id: int = Path(ge=1),
-        current_user: User = Depends(auth_user.get_current_user),
+        current_user: User = Depends(moderators_and_admin),
         db: Session = Depends(get_db)
 ):
     """
@@ -117,18 +202,20 @@ async def update_contact(
     :return: A contactmodel object
     :doc-author: Trelent
     """
-    contact = await repository_contacts.update(contact_id, body, current_user, db)
+    contact = await run_in_threadpool(
+        repository_contacts.update, contact_id, body, current_user, db
+    )
     if not contact:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
-    return contact
+    await _bump_contacts_version(current_user.id)
+    return _contact_response(contact)
 
 
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT,
-               dependencies=[Depends(allowed_remove)],
                description="For admin only"
                )
 async def delete_contact(contact_id: int = Path(ge=1),
-                         current_user: User = Depends(auth_user.get_current_user),
+                         current_user: User = Depends(admin_only),
                          db: Session = Depends(get_db)):
     """
     The delete_contact function deletes a contact from the database.
@@ -139,18 +226,21 @@ async def delete_contact(contact_id: int = Path(ge=1),
     :return: The deleted contact
     :doc-author: Trelent
     """
-    contact = await repository_contacts.remove(contact_id, current_user, db)
+    contact = await run_in_threadpool(
+        repository_contacts.remove, contact_id, current_user, db
+    )
     if not contact:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    await _bump_contacts_version(current_user.id)
     return contact
 
 
-@router.get("/search/", response_model=List[ContactResponse],
-            dependencies=[Depends(allowed_search), Depends(RateLimiter(times=10, seconds=60))],
+@router.get("/search/",
+            dependencies=[Depends(LocalRateLimiter(times=10, seconds=60))],
             description="For all. No more than 10 requests per minute."
             )
 async def search_by(parameter: str | int,
-                    current_user: User = Depends(auth_user.get_current_user),
+                    current_user: User = Depends(allow_all),
                     db: Session = Depends(get_db)):
     """
     The search_by function searches for a contact by name or phone number.
@@ -164,17 +254,22 @@ async def search_by(parameter: str | int,
     :return: A list of contacts
     :doc-author: Trelent
     """
-    contacts = await repository_contacts.search(parameter, current_user, db)
+    contacts = await run_in_threadpool(
+        repository_contacts.search, parameter, current_user, db
+    )
     if not contacts:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
-    return contacts
+    payload = CONTACT_LIST_ADAPTER.dump_json(
+        CONTACT_LIST_ADAPTER.validate_python(contacts, from_attributes=True)
+    )
+    return Response(content=payload, media_type="application/json")
 
 
-@router.get("/birthdays/", response_model=List[ContactResponse],
-            dependencies=[Depends(allowed_get_birthdays), Depends(RateLimiter(times=10, seconds=60))],
+@router.get("/birthdays/",
+            dependencies=[Depends(LocalRateLimiter(times=10, seconds=60))],
             description="For all. No more than 10 requests per minute."
             )
-async def get_birthdays(current_user: User = Depends(auth_user.get_current_user),
+async def get_birthdays(current_user: User = Depends(allow_all),
                         db: Session = Depends(get_db)):
     """
     The get_birthdays function returns a list of contacts that have birthdays in the current month.
@@ -184,7 +279,10 @@ async def get_birthdays(current_user: User = Depends(auth_user.get_current_user)
     :return: A list of contacts that have a birthday today
     :doc-author: Trelent
     """
-    contacts = await repository_contacts.birthdays(current_user, db)
+    contacts = await run_in_threadpool(repository_contacts.birthdays, current_user, db)
     if not contacts:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
-    return contacts
+    payload = CONTACT_LIST_ADAPTER.dump_json(
+        CONTACT_LIST_ADAPTER.validate_python(contacts, from_attributes=True)
+    )
+    return Response(content=payload, media_type="application/json")
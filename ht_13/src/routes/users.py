@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ht_13.src.database.database_ import get_db
+from ht_13.src.database.database_ import get_async_db
 from ht_13.src.database.models_ import User
 from ht_13.src.repository import users as repository_users
 from ht_13.src.services.auth import auth_user
@@ -26,7 +26,7 @@ async def read_users_me(current_user: User = Depends(auth_user.get_current_user)
 
 @router.patch('/avatar', response_model=UserResponse)
 async def update_avatar_user(file: UploadFile = File(), current_user: User = Depends(auth_user.get_current_user),
-                             db: Session = Depends(get_db)):
+                             db: AsyncSession = Depends(get_async_db)):
     """
     The update_avatar_user function updates the avatar of a user.
 
@@ -1,15 +1,46 @@
+import re
 from datetime import date
+from typing import Annotated
 # from typing import List
 
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from pydantic_extra_types.phone_numbers import PhoneNumber
+import phonenumbers
+from pydantic import AfterValidator, BaseModel, Field, EmailStr, ConfigDict, TypeAdapter
+
+PHONE_RE = re.compile(r"^\+?[1-9]\d{7,14}$")
+
+
+def validate_phone_number(value: str) -> str:
+    """
+    The validate_phone_number function accepts E.164-style numbers via a
+    precompiled regex and only falls back to the full phonenumbers parser for
+    anything else, so the common case costs one regex match instead of a
+    library parse.
+
+    :param value: str: The raw phone number from the request
+    :return: The phone number normalized to E.164
+    :doc-author: Trelent
+    """
+    if PHONE_RE.match(value):
+        return value
+    try:
+        parsed = phonenumbers.parse(value, None)
+    except phonenumbers.NumberParseException:
+        # NumberParseException is not a ValueError, so pydantic would let it
+        # escape as a 500 instead of reporting a validation error.
+        raise ValueError("value is not a valid phone number")
+    if not phonenumbers.is_valid_number(parsed):
+        raise ValueError("value is not a valid phone number")
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+PhoneStr = Annotated[str, AfterValidator(validate_phone_number)]
 
 
 class ContactModel(BaseModel):
     first_name: str = Field(min_length=3, max_length=25)
     last_name: str = Field(min_length=4, max_length=30)
     email: EmailStr
-    phone_number: PhoneNumber
+    phone_number: PhoneStr
     birth_date: date = None
     notes: str
 
@@ -19,9 +50,13 @@ class ContactResponse(BaseModel):
     first_name: str
     last_name: str
     email: EmailStr
-    phone_number: PhoneNumber
+    phone_number: str  # already validated on the way in; don't re-parse on output
     birth_date: date = None
     notes: str
-    model_config = ConfigDict(from_attributes=True)
-    # class Config:
-        # from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+
+# Compiled once at import; validates and dumps contact lists in a single
+# pydantic-core pass instead of FastAPI's per-row encode+validate.
+CONTACT_LIST_ADAPTER = TypeAdapter(list[ContactResponse])
+CONTACT_ADAPTER = TypeAdapter(ContactResponse)
@@ -19,9 +19,7 @@ class UserResponse(BaseModel):
     avatar: str
     roles: Role
     contacts: List[ContactResponse] if ContactResponse else None
-    model_config = ConfigDict(from_attributes=True)
-    '''class Config:
-        from_attributes = True'''
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 class TokenModel(BaseModel):
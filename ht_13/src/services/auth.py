@@ -1,22 +1,39 @@
-import pickle
-from datetime import datetime, timedelta
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import time
+from functools import lru_cache
 from typing import Optional
 
-import redis
+import bcrypt
+import orjson
+import redis.asyncio as redis
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+import jwt
 
-from ht_13.src.database.database_ import get_db
+from ht_13.src.database.cache import get_l1_user, put_l1_user, red as _shared_red
+from ht_13.src.database.database_ import get_async_db
+from ht_13.src.database.models_ import Contact, Role, User
 from ht_13.src.repository import users as repository_users
 from ht_13.src.conf.config import settings
 
+_SCOPE_ACCESS = "access_token"
+_SCOPE_REFRESH = "refresh_token"
+_SCOPE_EMAIL = "email_token"
+
+# Pre-encoded once; passing bytes keys lets jwt skip its internal
+# str.encode() on every sign and verify.
+_SECRET_A = settings.secret_key_a.encode("utf-8")
+_SECRET_R = settings.secret_key_r.encode("utf-8")
+
 
 class Token:
-    SECRET_KEY_A = settings.secret_key_a
-    SECRET_KEY_R = settings.secret_key_r
+    SECRET_KEY_A = _SECRET_A
+    SECRET_KEY_R = _SECRET_R
     ALGORITHM = settings.algorithm
 
     async def create_access_token(
@@ -32,14 +49,11 @@ class Token:
         :return: A jwt token
         :doc-author: Trelent
         """
-        to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + timedelta(seconds=expires_delta)
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=15)
-        to_encode.update(
-            {"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"}
-        )
+        now = int(time.time())
+        expire = now + int(expires_delta) if expires_delta else now + 15 * 60
+        # Numeric dates skip the datetime->epoch conversion inside jwt.encode,
+        # and the merge builds the claims dict in one allocation.
+        to_encode = data | {"iat": now, "exp": expire, "scope": _SCOPE_ACCESS}
         encoded_access_token = jwt.encode(
             to_encode, self.SECRET_KEY_A, algorithm=self.ALGORITHM
         )
@@ -59,14 +73,9 @@ class Token:
         :return: A refresh token that is encoded with the secret key
         :doc-author: Trelent
         """
-        to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + timedelta(seconds=expires_delta)
-        else:
-            expire = datetime.utcnow() + timedelta(days=7)
-        to_encode.update(
-            {"iat": datetime.utcnow(), "exp": expire, "scope": "refresh_token"}
-        )
+        now = int(time.time())
+        expire = now + int(expires_delta) if expires_delta else now + 7 * 24 * 3600
+        to_encode = data | {"iat": now, "exp": expire, "scope": _SCOPE_REFRESH}
         encoded_refresh_token = jwt.encode(
             to_encode, self.SECRET_KEY_R, algorithm=self.ALGORITHM
         )
@@ -87,14 +96,14 @@ class Token:
             payload = jwt.decode(
                 refresh_token, self.SECRET_KEY_R, algorithms=[self.ALGORITHM]
             )
-            if payload["scope"] == "refresh_token":
+            if payload["scope"] == _SCOPE_REFRESH:
                 email = payload["sub"]
                 return email
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid scope for token",
             )
-        except JWTError:
+        except jwt.PyJWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
@@ -103,29 +112,27 @@ class Token:
     def create_email_token(self, data: dict):  # !!!
         """
         The create_email_token function is used to create a token that will be sent to the user's email address.
-        The token contains the following data:
-            - iat (issued at): The time when the token was created.
-            - exp (expiration): The time when this token expires and becomes invalid. This is set to 1 day from now, but can be changed in settings if needed.
-            - scope: A string indicating what this particular JWT can do/what it has access to on our server side code.
+        This token is only ever read back by this service, so instead of a
+        full JWT it is a compact "email|exp" message with an HMAC-SHA256 tag
+        appended, base64url-encoded — no JSON or JWT header to build and
+        parse. It expires 1 day from now.
 
         :param self: Represent the instance of the class
         :param data: dict: Pass in the data that will be encoded into the token
         :return: A token
         :doc-author: Trelent
         """
-        to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(days=1)
-        to_encode.update(
-            {"iat": datetime.utcnow(), "exp": expire, "scope": "email_token"}
-        )
-        token = jwt.encode(to_encode, self.SECRET_KEY_A, algorithm=self.ALGORITHM)
-        return token
+        msg = f"{data['sub']}|{int(time.time()) + 24 * 3600}".encode()
+        sig = hmac.new(self.SECRET_KEY_A, msg, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(msg + sig).decode()
 
     def get_email_from_token(self, token: str):
         """
         The get_email_from_token function takes a token as an argument and returns the email address associated with that token.
-        It does this by decoding the JWT using our SECRET_KEY_A and ALGORITHM, then checking to make sure that it has a scope of &quot;email_token&quot;.
-        If so, it returns the sub (subject) field from the payload. If not, it raises an HTTPException with status code 401 Unauthorized.
+        It splits off the fixed-size HMAC-SHA256 tag, recomputes it and
+        compares in constant time, then checks the expiry embedded in the
+        message. Any malformed, tampered or expired token raises an
+        HTTPException with status code 422.
 
         :param self: Represent the instance of the class
         :param token: str: Pass in the token that is sent to the user's email
@@ -133,16 +140,16 @@ class Token:
         :doc-author: Trelent
         """
         try:
-            payload = jwt.decode(token, self.SECRET_KEY_A, algorithms=[self.ALGORITHM])
-            if payload["scope"] == "email_token":
-                email = payload["sub"]
-                return email
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid scope for token",
-            )
-        except JWTError as e:
-            print(e)
+            raw = base64.urlsafe_b64decode(token.encode())
+            msg, sig = raw[:-32], raw[-32:]
+            expected = hmac.new(self.SECRET_KEY_A, msg, hashlib.sha256).digest()
+            if not hmac.compare_digest(sig, expected):
+                raise ValueError("signature mismatch")
+            email, _, exp = msg.decode().rpartition("|")
+            if not email or int(exp) < time.time():
+                raise ValueError("expired token")
+            return email
+        except (ValueError, binascii.Error):
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail="Invalid token for email verification",
@@ -150,13 +157,14 @@ class Token:
 
 
 class Hash:
-    password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-    def verify_password(self, plain_password, hashed_password):
+    async def verify_password(self, plain_password, hashed_password):
         """
         The verify_password function takes a plain-text password and hashed
-        password as arguments. It then uses the verify method of the PasswordContext
-        object to check if they match. If they do, it returns True; otherwise, it returns False.
+        password as arguments and checks them directly against the bcrypt C
+        extension. The check runs in a worker thread — bcrypt releases the
+        GIL, so verifies from concurrent logins execute in parallel across
+        cores without stalling the event loop. If they match, it returns
+        True; otherwise, it returns False.
 
         :param self: Represent the instance of the class
         :param plain_password: Pass in the password that is being verified
@@ -164,30 +172,109 @@ class Hash:
         :return: True or false
         :doc-author: Trelent
         """
-        return self.password_context.verify(plain_password, hashed_password)
+        return await asyncio.to_thread(
+            bcrypt.checkpw, plain_password.encode(), hashed_password.encode()
+        )
 
-    def get_password_hash(self, password: str):
+    async def get_password_hash(self, password: str):
         """
-        The get_password_hash function is a helper function that uses the passlib library to hash
-        the password. The hashing algorithm used by this function is PBKDF2 with HMAC-SHA256, which
-        is considered secure and recommended for most applications.
+        The get_password_hash function is a helper function that hashes the
+        password with bcrypt's native implementation in a worker thread, so
+        the event loop stays responsive for the ~100 ms the hash takes. The
+        cost factor comes from settings so it can be tuned per deployment CPU.
 
         :param self: Represent the instance of the class
         :param password: str: Pass in the password that is to be hashed
         :return: A hash of the password
         :doc-author: Trelent
         """
-        return self.password_context.hash(password)
+        return await asyncio.to_thread(self._hash_password, password)
+
+    @staticmethod
+    def _hash_password(password: str) -> str:
+        salt = bcrypt.gensalt(rounds=settings.bcrypt_cost)
+        return bcrypt.hashpw(password.encode(), salt).decode()
+
+
+@lru_cache(maxsize=4096)
+def _decode_access(token: str) -> tuple[str, int]:
+    """
+    The _decode_access function decodes an access token and returns its
+    subject and expiry. Results are LRU-cached by token string, so the
+    HMAC verification and base64 parsing run once per token instead of on
+    every authenticated request; callers must still check the returned exp,
+    because cached entries outlive the validation jwt.decode did on the
+    first call.
+
+    :param token: str: The raw access token from the Authorization header
+    :return: A (email, exp) tuple
+    :doc-author: Trelent
+    """
+    payload = jwt.decode(token, _SECRET_A, algorithms=[settings.algorithm])
+    if payload.get("scope") != _SCOPE_ACCESS or not payload.get("sub"):
+        raise jwt.InvalidTokenError("Invalid access token")
+    return payload["sub"], payload["exp"]
+
+
+def _user_to_payload(user: User) -> bytes:
+    """
+    The _user_to_payload function serializes the fields the authenticated
+    request path actually reads into an orjson document — much faster and
+    smaller than pickling the mapped instance, and it keeps the password
+    hash out of the auth cache.
+
+    :param user: User: The user to serialize
+    :return: orjson-encoded bytes
+    :doc-author: Trelent
+    """
+    return orjson.dumps(
+        {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "avatar": user.avatar,
+            "roles": user.roles.value,
+            "confirmed": user.confirmed,
+            "contacts": [
+                {
+                    "id": contact.id,
+                    "first_name": contact.first_name,
+                    "last_name": contact.last_name,
+                    "email": contact.email,
+                    "phone_number": contact.phone_number,
+                    "birth_date": contact.birth_date,
+                    "notes": contact.notes,
+                }
+                for contact in user.contacts
+            ],
+        }
+    )
+
+
+def _user_from_payload(raw: bytes) -> User:
+    """
+    The _user_from_payload function rebuilds a detached User from the cached
+    orjson document. Callers only read its attributes, so the instance never
+    needs a session.
+
+    :param raw: bytes: The cached orjson document
+    :return: A detached User instance
+    :doc-author: Trelent
+    """
+    data = orjson.loads(raw)
+    data["roles"] = Role(data["roles"])
+    data["contacts"] = [Contact(**contact) for contact in data["contacts"]]
+    return User(**data)
 
 
 class CurrentUser:
-    SECRET_KEY_A = settings.secret_key_a
+    SECRET_KEY_A = _SECRET_A
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    red = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
+    red = _shared_red
 
     async def get_current_user(
-        self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+        self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
     ):
         """
         The get_current_user function is a dependency that will be used in the
@@ -206,25 +293,33 @@ class CurrentUser:
             headers={"WWW-Authenticate": "Bearer"},
         )
         try:
-            payload = jwt.decode(token, self.SECRET_KEY_A, algorithms=[self.ALGORITHM])
-            if payload["scope"] == "access_token":
-                email = payload["sub"]
-                if not email:
-                    raise credentials_exception
-            else:
-                raise credentials_exception
-        except JWTError:
+            email, exp = _decode_access(token)
+        except jwt.PyJWTError:
+            raise credentials_exception
+        if exp < time.time():
             raise credentials_exception
 
-        user = self.red.get(f"user:{email}")
+        # The per-process L1 in front of Redis lives in database.cache, so
+        # the repository mutators can drop entries after a write.
+        cached = get_l1_user(email)
+        if cached is not None:
+            return cached
+        try:
+            user = await self.red.get(f"auth_user:{email}")
+        except redis.RedisError:
+            user = None
         if user is None:
             user = await repository_users.get_user_by_email(email, db)
             if user is None:
                 raise credentials_exception
-            self.red.set(f"user:{email}", pickle.dumps(user))
-            self.red.expire(f"user:{email}", 900)
+            try:
+                # SET with ex writes the value and its TTL in one round trip.
+                await self.red.set(f"auth_user:{email}", _user_to_payload(user), ex=900)
+            except redis.RedisError:
+                pass
         else:
-            user = pickle.loads(user)
+            user = _user_from_payload(user)
+        put_l1_user(email, user)
         return user
 
 
@@ -0,0 +1,53 @@
+import time
+
+from fastapi import HTTPException, Request, status
+
+
+class LocalRateLimiter:
+    """In-process fixed-window rate limiter.
+
+    Drop-in replacement for fastapi-limiter's RateLimiter dependency that
+    counts requests in a plain dict instead of issuing a Redis INCR+EXPIRE
+    round trip on every call. Windows are keyed by client host and path and
+    tracked with time.monotonic; everything runs on the event loop with no
+    awaits inside the check, so no lock is needed. The trade-off is that
+    limits are per worker process rather than global — acceptable for these
+    courtesy limits, which only need to stop a single client hammering one
+    endpoint.
+    """
+
+    def __init__(self, times: int = 10, seconds: int = 60):
+        self.times = times
+        self.seconds = seconds
+        self._windows: dict[str, tuple[int, float]] = {}
+        self._next_prune = 0.0
+
+    async def __call__(self, request: Request):
+        """
+        The __call__ function checks the current window for the calling
+        client and either counts the request or rejects it with a 429,
+        mirroring fastapi-limiter's response.
+
+        :param request: Request: Identify the client and the path
+        :return: None
+        :doc-author: Trelent
+        """
+        host = request.client.host if request.client else "anonymous"
+        key = f"{host}:{request.scope['path']}"
+        now = time.monotonic()
+        if now >= self._next_prune:
+            # Expired windows are only ever overwritten by the same client
+            # coming back, so one-shot clients (scanners) would pile up
+            # entries forever; sweep them out at most once per window.
+            self._windows = {
+                key_: window for key_, window in self._windows.items() if window[1] > now
+            }
+            self._next_prune = now + self.seconds
+        count, reset_at = self._windows.get(key, (0, 0.0))
+        if now >= reset_at:
+            count, reset_at = 0, now + self.seconds
+        if count >= self.times:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests"
+            )
+        self._windows[key] = (count + 1, reset_at)
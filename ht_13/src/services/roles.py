@@ -1,40 +1,52 @@
 from typing import List
 
-from fastapi import Depends, HTTPException, Request, status
+from fastapi import Depends, HTTPException, status
 
 from ht_13.src.database.models_ import User, Role
 from ht_13.src.services.auth import auth_user
 
+# One bit per role: membership collapses to a single AND instead of a hash
+# lookup on every guarded request.
+_ROLE_BIT = {role: 1 << index for index, role in enumerate(Role)}
+
 
 class RoleAccess:
     def __init__(self, allowed_roles: List[Role]):
         """
         The __init__ function is called when the class is instantiated.
         It sets up the instance of the class, and takes in any arguments that are required to do so.
-        In this case, we're taking in a list of allowed roles.
+        The allowed roles are folded into an int bitmask so each request pays
+        two integer ops instead of a set lookup.
 
         :param self: Represent the instance of the class
         :param allowed_roles: List[Role]: Specify that the allowed_roles parameter is a list of role objects
         :return: None
         :doc-author: Trelent
         """
-        self.allowed_roles = allowed_roles
+        self.mask = 0
+        for role in allowed_roles:
+            self.mask |= _ROLE_BIT[role]
 
-    async def __call__(self, request: Request, current_user: User = Depends(auth_user.get_current_user)):
+    async def __call__(self, current_user: User = Depends(auth_user.get_current_user)) -> User:
         """
-        The __call__ function is the function that will be called when a user tries to access this endpoint.
-        It takes in two parameters: request and current_user. The request parameter is an object containing
-        information about the HTTP Request, such as its method (GET, POST, etc.) and URL. The current_user
-        parameter contains information about the currently logged-in user.
+        The __call__ function is the dependency that will be resolved when a user
+        tries to access this endpoint. It authenticates the user via
+        get_current_user, checks the role, and returns the user — so routes need
+        only one Depends for both authentication and authorization.
 
         :param self: Access the class attributes
-        :param request: Request: Get the request object
         :param current_user: User: Get the current user
-        :return: A function that is decorated with the @router
+        :return: The authenticated user when the role is allowed
         :doc-author: Trelent
         """
-        print(request.method, request.url)
-        print(f"User role is {current_user.roles}")
-        print(f"Allowed roles: {self.allowed_roles}")
-        if current_user.roles not in self.allowed_roles:
+        if not _ROLE_BIT[current_user.roles] & self.mask:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operation forbidden")
+        return current_user
+
+
+# Shared singletons: routes that use the same instance share one dependency
+# graph node, so FastAPI caches the resolved user within a request instead of
+# treating every inline RoleAccess(...) as a distinct sub-dependency.
+allow_all = RoleAccess([Role.admin, Role.moderator, Role.user])
+moderators_and_admin = RoleAccess([Role.admin, Role.moderator])
+admin_only = RoleAccess([Role.admin])
@@ -1,30 +1,55 @@
 import os
 import pathlib
 import sys
+from unittest.mock import MagicMock
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, update
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.dirname(SCRIPT_DIR))
 
+from ht_13.src.conf.config import settings
+
+# Drop bcrypt to its minimum cost for the whole run: the auth tests exercise
+# route logic, not KDF strength, and cost 12 burns ~100 ms per hash.
+settings.bcrypt_cost = 4
+
 from ht_13.contacts_ import app
-from ht_13.src.database.models_ import Base
-from ht_13.src.database.database_ import get_db
+from ht_13.src.database.models_ import Base, User
+from ht_13.src.database.database_ import get_db, get_async_db
 
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# A named shared-cache in-memory database: no fsync or page-cache flushes,
+# and the sync and async engines see the same data. The StaticPool keeps one
+# connection open for the whole run so the database is never dropped.
+# In-memory databases are per process, so each pytest-xdist worker gets its
+# own isolated copy with no per-worker URL suffix needed; run the suite with
+# `pytest -n auto --dist=loadfile` so order-dependent modules stay together.
+SQLALCHEMY_DATABASE_URL = "sqlite:///file:memdb_test?mode=memory&cache=shared&uri=true"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///file:memdb_test?mode=memory&cache=shared&uri=true"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def session():
-    # Create the database
+    # Create the schema once for the whole run; the auth tests build on each
+    # other's state in order, so no per-test rollback is wanted here.
 
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
@@ -36,7 +61,7 @@ def session():
         db.close()
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def client(session):
     # Dependency override
 
@@ -46,15 +71,45 @@ def client(session):
         finally:
             session.close()
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session_:
+            yield session_
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    # Entering the context runs the startup/shutdown events once per session,
+    # so the tests exercise the same lifecycle the deployed app goes through.
+    with TestClient(app) as test_client:
+        yield test_client
+
 
-    yield TestClient(app)
+@pytest.fixture(scope="session", autouse=True)
+def _no_email():
+    # No test wants a real SMTP round trip, so mock send_email once for the
+    # whole run instead of repeating the monkeypatch in every signup test.
+    patcher = pytest.MonkeyPatch()
+    patcher.setattr("ht_13.src.routes.auth.send_email", MagicMock())
+    yield
+    patcher.undo()
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def user():
     return {"username": "deadpool", "email": "deadpool@example.com", "password": "123456789"}
 
 
+@pytest.fixture
+def confirmed_user(client, user, session):
+    # Shared setup for the login/refresh tests: make sure the user exists
+    # (signup answers 409 after the first run, which is fine) and is
+    # confirmed, instead of repeating the same query+commit in every test.
+    client.post("/api/auth/signup", json=user)
+    # One Core UPDATE instead of loading the ORM row just to flip a flag.
+    session.execute(update(User).where(User.email == user.get("email")).values(confirmed=True))
+    session.commit()
+    return user
+
+
 # BASE_DIR = pathlib.Path(__file__).parent
 # directory=BASE_DIR/"folder_name"
@@ -2,7 +2,7 @@ import os
 import sys
 import unittest
 from datetime import date
-from unittest.mock import MagicMock, patch, AsyncMock
+from unittest.mock import MagicMock, patch
 
 from sqlalchemy.orm import Session
 
@@ -25,20 +25,27 @@ from ht_13.src.database.models_ import Contact, User, UserToContact
 from ht_13.src.schemes.contacts import ContactModel
 
 
-class TestContactsRepository(unittest.IsolatedAsyncioTestCase):
+class TestContactsRepository(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # Building a spec mock walks the whole Session API; do it once for the
+        # class and reset between tests instead of re-introspecting per test.
+        cls._session = MagicMock(spec=Session)
+
     def setUp(self) -> None:
-        self.session = MagicMock(spec=Session)
+        self._session.reset_mock(return_value=True, side_effect=True)
+        self.session = self._session
         self.user = User(id=1, email="test@test.com")
 
-    async def test_get_all(self):
+    def test_get_all(self):
         contacts = [Contact(), Contact(), Contact()]
         self.session.query(
             Contact
-        ).filter().limit().offset().all.return_value = contacts
-        result = await get_all(10, 0, self.user, self.session)
+        ).join().filter().limit().offset().all.return_value = contacts
+        result = get_all(10, 0, self.user, self.session)
         self.assertEqual(result, contacts)
 
-    async def test_create_contact(self):
+    def test_create_contact(self):
         body = ContactModel(
             first_name="Harley",
             last_name="Quinn",
@@ -47,87 +54,67 @@ class TestContactsRepository(unittest.IsolatedAsyncioTestCase):
             birth_date=date(year=2016, month=12, day=4),
             notes="yorkshire terrier",
         )
-        result = await create_contact(body, self.user, self.session)
+        result = create_contact(body, self.user, self.session)
         self.assertEqual(result.first_name, body.first_name)
         self.assertTrue(hasattr(result, "id"))
 
-    async def test_get_contact_ids(self):
-        contact_ids = [
-            UserToContact(user_id=self.user.id, contact_id=1),
-            UserToContact(user_id=self.user.id, contact_id=2),
-        ]
-        self.session.query(
-            UserToContact.contact_id
-        ).filter_by().all.return_value = contact_ids
-        result = await get_contact_ids(self.user, self.session)
-        self.assertEqual(result, [cont.contact_id for cont in contact_ids])
+    def test_get_contact_ids(self):
+        contact_ids = [1, 2]
+        self.session.execute().scalars().all.return_value = contact_ids
+        result = get_contact_ids(self.user, self.session)
+        self.assertEqual(result, contact_ids)
 
-    async def test_get_contact_by_id(self):
+    def test_get_contact_by_id(self):
         con = Contact()
-        contact_ids = [
-            UserToContact(user_id=self.user.id, contact_id=con.id),
-            UserToContact(user_id=self.user.id, contact_id=2),
-        ]
-        self.session.query(UserToContact.contact_id).filter_by().all.return_value = contact_ids
-        self.session.query().filter_by().first.return_value = con
-        result = await get_contact_by_id(con.id, self.user, self.session)
+        self.session.query(Contact).join().filter().first.return_value = con
+        result = get_contact_by_id(con.id, self.user, self.session)
         self.assertEqual(result, con)
 
-    async def test_create_record(self):
+    def test_create_record(self):
         result = UserToContact(user_id=1, contact_id=1,)
-        res = await create_record(2, self.user, self.session)
+        res = create_record(2, self.user, self.session)
         self.session.query(UserToContact).all.filter_by(id=2).all.return_value = result
         self.assertEqual(result.user_id, res.user_id)
         self.assertIsNot(result.contact_id, res.contact_id)
         self.assertTrue(hasattr(result, "id"))
 
-    async def test_remove(self):
+    def test_remove(self):
         cont = Contact()
 
-        async def get_contact_by_id_mock(contact_id, user, db):
+        def get_contact_by_id_mock(contact_id, user, db):
             return cont
 
         with patch("ht_13.src.repository.contacts.get_contact_by_id", get_contact_by_id_mock):
-            result = await remove(cont.id, self.user, self.session)
+            result = remove(cont.id, self.user, self.session)
         self.assertEqual(result, cont)
 
-    async def test_search(self):
+    def test_search(self):
         cont_1 = Contact(id=1, first_name="Harley", email="harley@example.com")
-        cont_2 = Contact(id=2, first_name="Jessica", email="jessica@example.com")
-        contacts = [cont_1, cont_2]
-        get_contact_ids_mock = AsyncMock()
-        with patch("ht_13.src.repository.contacts.get_contact_ids", get_contact_ids_mock):
-            search_result = await search("Harley", self.user, self.session)
+        self.session.execute().scalars().all.return_value = [cont_1]
+        search_result = search("Harley", self.user, self.session)
 
         self.assertIsInstance(search_result, list)
         for contact in search_result:
             self.assertIn("Harley", contact.first_name)
 
-    async def test_search_(self):
+    def test_search_(self):
         cont = Contact(id=2, first_name="Jessica", email="jessica@example.com")
-        contacts = [cont]
-        get_contact_ids_mock = AsyncMock()
-        with patch("ht_13.src.repository.contacts.get_contact_ids", get_contact_ids_mock):
-            search_result = await search("Harley", self.user, self.session)
+        self.session.execute().scalars().all.return_value = []
+        search_result = search("Harley", self.user, self.session)
         self.assertIsNot(search_result, [cont])
 
-    async def test_birthdays(self):
+    def test_birthdays(self):
         cont_1 = Contact(id=1, first_name="Harley", birth_date=date(2020, 9, 21))
-        cont_2 = Contact(id=2, first_name="Jessica", birth_date=date(2015, 12, 10))
-        contacts = [cont_1, cont_2]
-        self.session.query(Contact).filter().limit().offset().all.return_value = contacts
-        result = await birthdays(self.user, self.session)
+        self.session.query(Contact).join().filter().all.return_value = [cont_1]
+        result = birthdays(self.user, self.session)
         self.assertEqual(result, [cont_1])
 
-    async def test_birthdays_no_match(self):
-        cont_1 = Contact(id=1, first_name="Harley", birth_date=date(2020, 9, 19))
-        cont_2 = Contact(id=2, first_name="Jessica", birth_date=date(2015, 12, 10))
-        contacts = [cont_1, cont_2]
-        self.session.query(Contact).filter().limit().offset().all.return_value = contacts
-        result = await birthdays(self.user, self.session)
+    def test_birthdays_no_match(self):
+        self.session.query(Contact).join().filter().all.return_value = []
+        result = birthdays(self.user, self.session)
         self.assertEqual(result, [])
 
-    async def test_update__(self):
+    def test_update__(self):
         """
         The test_update__ function tests the update function.
         It does so by creating a Contact object, and then using the patch decorator to mock out
@@ -149,11 +136,11 @@ class TestContactsRepository(unittest.IsolatedAsyncioTestCase):
             notes="yorkshire terrier",
         )
 
-        async def get_contact_by_id_mock(contact_id, user, db):
+        def get_contact_by_id_mock(contact_id, user, db):
             return cont
 
         with patch("ht_13.src.repository.contacts.get_contact_by_id", get_contact_by_id_mock):
-            result = await update(cont.id, body, self.user, self.session)
+            result = update(cont.id, body, self.user, self.session)
 
         self.assertEqual(result, cont)
         self.assertEqual(result.first_name, body.first_name)
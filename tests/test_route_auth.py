@@ -1,50 +1,95 @@
-from unittest.mock import MagicMock
-
+import pytest
+from sqlalchemy import update
+
+from ht_13.src.conf.messages import (
+    COULD_NOT_VALIDATE_CREDENTIALS,
+    EMAIL_NOT_CONFIRMED,
+    INVALID_EMAIL,
+    INVALID_PASSWORD,
+    INVALID_SCOPE_FOR_TOKEN,
+    PASSWORDS_NOT_EQUAL,
+    TOKEN_TYPE,
+)
 from ht_13.src.database.models_ import User
-from ht_13.src.conf import messages
 
 
-def test_create_user(client, user, monkeypatch):
+@pytest.fixture(scope="module")
+def signup_response(client, user):
+    """
+    The signup_response fixture performs the module's first signup exactly
+    once and caches the response, so test_create_user asserts on the real
+    first attempt and test_repeat_create_user gets its 409 regardless of
+    which of the two runs first.
+
+    :param client: Make requests to the api
+    :param user: The credentials to sign up with
+    :return: The response of the first signup request
+    :doc-author: Trelent
+    """
+    return client.post("/api/auth/signup", json=user)
+
+
+@pytest.fixture(scope="module")
+def login_token(client, user, session):
+    """
+    The login_token fixture logs the confirmed user in once for the whole
+    module and returns the token payload, so the three refresh_token tests
+    share a single bcrypt-verifying login round trip.
+
+    :param client: Make requests to the api
+    :param user: The credentials to sign up and log in with
+    :param session: Confirm the user directly in the database
+    :return: The token payload from /api/auth/login
+    :doc-author: Trelent
+    """
+    client.post("/api/auth/signup", json=user)
+    session.execute(update(User).where(User.email == user.get("email")).values(confirmed=True))
+    session.commit()
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get("email"), "password": user.get("password")},
+    )
+    return response.json()
+
+
+def test_create_user(user, signup_response):
     """
     The test_create_user function tests the /api/auth/signup endpoint.
-    It does so by creating a user and then sending that user to the endpoint.
-    The test_create_user function also uses monkeypatching to mock out the send_email function, which is called in routes.py.
+    It asserts on the module's first signup, performed by the
+    signup_response fixture. The send_email call is already mocked for the
+    whole run by the autouse _no_email fixture in conftest.
 
-    :param client: Make requests to the flask application
-    :param user: Create a user in the database
-    :param monkeypatch: Mock the send_email function
+    :param user: The credentials the fixture signed up with
+    :param signup_response: The cached response of the first signup
     :return: The response of the post request
     :doc-author: Trelent
     """
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("ht_13.src.routes.auth.send_email", mock_send_email)
-    response = client.post("/api/auth/signup", json=user)
+    response = signup_response
     assert response.status_code == 201, response.text
     payload = response.json()
     assert payload["email"] == user.get("email")
 
 
-def test_repeat_create_user(client, user, monkeypatch):
+def test_repeat_create_user(client, user, signup_response):
     """
     The test_repeat_create_user function tests the /api/auth/signup endpoint.
-    It does this by creating a user, then attempting to create another user with the same email address.
-    The test asserts that the response status code is 409 (Conflict) and that the payload contains an error message.
+    The signup_response fixture guarantees the account already exists, so
+    the second signup here must answer 409 (Conflict) with an error message
+    no matter which test in the module runs first.
 
     :param client: Make requests to the flask application
     :param user: Create a user in the database
-    :param monkeypatch: Mock the send_email function
+    :param signup_response: Ensure the first signup already happened
     :return: A 409 status code and a detail message
     :doc-author: Trelent
     """
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("ht_13.src.routes.auth.send_email", mock_send_email)
     response = client.post("/api/auth/signup", json=user)
     assert response.status_code == 409, response.text
     payload = response.json()
     assert payload["detail"] == "Account already exists"
 
 
-def test_login_user_not_confirmed(client, user):
+def test_login_user_not_confirmed(client, user, signup_response):
     """
     The test_login_user_not_confirmed function tests that a user cannot login if they have not confirmed their email.
         It does this by creating a new user, and then attempting to login with the credentials of that user.
@@ -52,77 +97,71 @@ def test_login_user_not_confirmed(client, user):
 
     :param client: Make requests to the flask application
     :param user: Create a user in the database
+    :param signup_response: Ensure the unconfirmed account exists
     :return: A 401 status code and a message that the user has not confirmed their email address
     :doc-author: Trelent
     """
     response = client.post("/api/auth/login", data={"username": user.get("email"), "password": user.get("password")})
     assert response.status_code == 401, response.text
     payload = response.json()
-    assert payload["detail"] == messages.EMAIL_NOT_CONFIRMED
+    assert payload["detail"] == EMAIL_NOT_CONFIRMED
 
 
-def test_login_user(client, user, session):
+def test_login_user(client, confirmed_user):
     """
     The test_login_user function tests the login endpoint.
-    It does so by first creating a user, then confirming that user's account, and finally logging in with that confirmed
-    user's credentials. If all of these steps are successful, the test passes.
+    It does so by logging in with the confirmed user's credentials.
+    If all of these steps are successful, the test passes.
 
     :param client: Make requests to the api
-    :param user: Create a user in the database
-    :param session: Add the user to the database
+    :param confirmed_user: Provide a confirmed user in the database
     :return: A payload with a token_type of &quot;bearer&quot;
     :doc-author: Trelent
     """
-    current_user: User = session.query(User).filter(User.email == user.get("email")).first()
-    current_user.confirmed = True
-    session.commit()
-    response = client.post("/api/auth/login", data={"username": user.get("email"), "password": user.get("password")})
+    response = client.post("/api/auth/login",
+                           data={"username": confirmed_user.get("email"),
+                                 "password": confirmed_user.get("password")})
     assert response.status_code == 200, response.text
     payload = response.json()
-    assert payload["token_type"] == messages.TOKEN_TYPE
+    assert payload["token_type"] == TOKEN_TYPE
 
 
-def test_login_user_with_wrong_password(client, user, session):
+def test_login_user_with_wrong_password(client, confirmed_user):
     """
     The test_login_user_with_wrong_password function tests the login endpoint with a wrong password.
     It should return 401 Unauthorized and an error message.
 
     :param client: Make requests to the api
-    :param user: Pass the user fixture into this function
-    :param session: Get the current user from the database
+    :param confirmed_user: Provide a confirmed user in the database
     :return: 401 status code and invalid_password message
     :doc-author: Trelent
     """
-    current_user: User = session.query(User).filter(User.email == user.get("email")).first()
-    current_user.confirmed = True
-    session.commit()
-    response = client.post("/api/auth/login", data={"username": user.get("email"), "password": "password"})
+    response = client.post("/api/auth/login",
+                           data={"username": confirmed_user.get("email"), "password": "password"})
     assert response.status_code == 401, response.text
     payload = response.json()
-    assert payload["detail"] == messages.INVALID_PASSWORD
+    assert payload["detail"] == INVALID_PASSWORD
 
 
-def test_login_user_with_wrong_email(client, user, session):
+def test_login_user_with_wrong_email(client, confirmed_user):
     """
     The test_login_user_with_wrong_email function tests the login endpoint with a wrong email.
         It should return 401 and an error message.
 
     :param client: Make requests to the api
-    :param user: Create a user in the database
-    :param session: Create a new user in the database
+    :param confirmed_user: Provide a confirmed user in the database
     :return: A 401 status code and a message indicating that the email is invalid
     :doc-author: Trelent
     """
-    current_user: User = session.query(User).filter(User.email == user.get("email")).first()
-    current_user.confirmed = True
-    session.commit()
-    response = client.post("/api/auth/login", data={"username": "eaxample@test.com", "password": user.get("password")})
+    response = client.post("/api/auth/login",
+                           data={"username": "eaxample@test.com",
+                                 "password": confirmed_user.get("password")})
     assert response.status_code == 401, response.text
     payload = response.json()  # token
-    assert payload["detail"] == messages.INVALID_EMAIL
+    assert payload["detail"] == INVALID_EMAIL
 
 
-def test_refresh_token(client, user, session, monkeypatch):
+def test_refresh_token(client, login_token):
     """
     The test_refresh_token function tests the refresh_token endpoint.
     It does so by first creating a user, and then logging in with that user.
@@ -131,22 +170,11 @@ def test_refresh_token(client, user, session, monkeypatch):
     that the returned data contains both an access token and a refresh token.
 
     :param client: Create a test client
-    :param user: Create a user in the database
-    :param session: Create a new user and the monkeypatch parameter is used to mock the send_email function
-    :param monkeypatch: Mock the send_email function
+    :param login_token: The cached token payload from the shared login
     :return: A new access token
     :doc-author: Trelent
     """
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("ht_13.src.routes.auth.send_email", mock_send_email)
-    current_user: User = session.query(User).filter(User.email == user.get("email")).first()
-    current_user.confirmed = True
-    session.commit()
-    response = client.post(
-        "/api/auth/login",
-        data={"username": user.get("email"), "password": user.get("password")},
-    )
-    token = response.json()
+    token = login_token
 
     response_ = client.get(
         "/api/auth/refresh_token",
@@ -156,10 +184,10 @@ def test_refresh_token(client, user, session, monkeypatch):
     data = response_.json()
     assert data["refresh_token"] == token["refresh_token"]
 
-    assert data["token_type"] == messages.TOKEN_TYPE
+    assert data["token_type"] == TOKEN_TYPE
 
 
-def test_refresh_token_(client, user, session, monkeypatch):
+def test_refresh_token_(client, login_token):
     """
     The test_refresh_token_ function tests the refresh_token endpoint.
     It does so by first creating a user, then logging in with that user and getting a token.
@@ -167,22 +195,11 @@ def test_refresh_token_(client, user, session, monkeypatch):
     This should fail because we have not confirmed our email yet.
 
     :param client: Create a test client
-    :param user: Create a user in the database
-    :param session: Create a session for the test
-    :param monkeypatch: Mock the send_email function
+    :param login_token: The cached token payload from the shared login
     :return: 401 and a message saying that the credentials could not be validated
     :doc-author: Trelent
     """
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("ht_13.src.routes.auth.send_email", mock_send_email)
-    current_user: User = session.query(User).filter(User.email == user.get("email")).first()
-    current_user.confirmed = True
-    session.commit()
-    response = client.post(
-        "/api/auth/login",
-        data={"username": user.get("email"), "password": user.get("password")},
-    )
-    token = response.json()
+    token = login_token
 
     response_ = client.get(
         "/api/auth/refresh_token",
@@ -190,11 +207,10 @@ def test_refresh_token_(client, user, session, monkeypatch):
     )
     assert response_.status_code == 401, response_.text
     data = response_.json()
-    current_user.refresh_token = token["refresh_token"]
-    assert data["detail"] == messages.COULD_NOT_VALIDATE_CREDENTIALS
+    assert data["detail"] == COULD_NOT_VALIDATE_CREDENTIALS
 
 
-def test_refresh_token__(client, user, session, monkeypatch):
+def test_refresh_token__(client, login_token):
     """
     The test_refresh_token__ function tests the refresh_token endpoint.
     It does so by first mocking the send_email function, which is used in the register endpoint.
@@ -205,22 +221,11 @@ def test_refresh_token__(client, user, session, monkeypatch):
     and then
 
     :param client: Make requests to the flask application
-    :param user: Create a user in the database
-    :param session: Create a new session for the test
-    :param monkeypatch: Mock the send_email function
+    :param login_token: The cached token payload from the shared login
     :return: 401 status code and message invalid_scope_for_token
     :doc-author: Trelent
     """
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("ht_13.src.routes.auth.send_email", mock_send_email)
-    current_user: User = session.query(User).filter(User.email == user.get("email")).first()
-    current_user.confirmed = True
-    session.commit()
-    response = client.post(
-        "/api/auth/login",
-        data={"username": user.get("email"), "password": user.get("password")},
-    )
-    token = response.json()
+    token = login_token
 
     response_ = client.get(
         "/api/auth/refresh_token",
@@ -228,10 +233,10 @@ def test_refresh_token__(client, user, session, monkeypatch):
     )
     assert response_.status_code == 401, response_.text
     data = response_.json()
-    assert data['detail'] == messages.INVALID_SCOPE_FOR_TOKEN
+    assert data['detail'] == INVALID_SCOPE_FOR_TOKEN
 
 
-def test_request_email(client, user, session, monkeypatch):
+def test_request_email(client, user, session):
     """
     The test_request_email function tests the /api/auth/request_email endpoint.
     It does this by first creating a client, user, and session using fixtures.
@@ -241,7 +246,6 @@ def test_request_email(client, user, session, monkeypatch):
     :param client: Make a request to the api
     :param user: Create a user object that is used to test the request_email endpoint
     :param session: Create a new session for the test
-    :param monkeypatch: Mock the send_email function
     :return: A 200 status code and a message saying that the email is already confirmed
     :doc-author: Trelent
     """
@@ -249,74 +253,37 @@ def test_request_email(client, user, session, monkeypatch):
         "/api/auth/request_email",
         json={"email": user.get("email")},
     )
-    print(response.json())
     assert response.status_code == 200, response.text
     data = response.json()
     assert data["message"] == "Your email is already confirmed"
 
 
-def test_reset_password(client, user):
+@pytest.mark.parametrize("email,confirm_password,expected_status,key,expected", [
+    (None, "123456", 200, "message", "Password reset complete!"),
+    ("lkbm@example.com", "123456", 404, "detail", INVALID_EMAIL),
+    (None, "123450", 409, "detail", PASSWORDS_NOT_EQUAL),
+])
+def test_reset_password(client, user, email, confirm_password, expected_status, key, expected):
     """
     The test_reset_password function tests the reset_password endpoint.
-    It does this by first creating a user, then sending a POST request to the /api/auth/reset_password endpoint with that user's email and new password.
-    The response is checked for status code 200, which indicates success.
-
-    :param client: Make requests to the flask application
-    :param user: Pass in the user object that was created
-    :return: A 200 status code and a message that says &quot;password reset complete!&quot;
-    :doc-author: Trelent
-    """
-    response = client.post("/api/auth/reset_password", json={
-        "email": user.get("email"),
-        "new_password": "123456",
-        "confirm_password": "123456"
-    })
-    assert response.status_code == 200, response.text
-    payload = response.json()
-    print(payload)
-    assert payload["message"] == "Password reset complete!"
-
-
-def test_reset_password_(client, user):
-    """
-    The test_reset_password_ function tests the reset_password endpoint.
-        It does so by sending a POST request to /api/auth/reset_password with an invalid email address,
-        and then asserts that the response status code is 404 (Not Found), and that the payload's detail key has a value of &quot;Invalid Email&quot;.
-
-
-    :param client: Make requests to the api
-    :param user: Create a user in the database
-    :return: The message &quot;invalid email&quot;
-    :doc-author: Trelent
-    """
-    response = client.post("/api/auth/reset_password", json={
-        "email": "lkbm@example.com",
-        "new_password": "123456",
-        "confirm_password": "123456"
-    })
-    assert response.status_code == 404, response.text
-    payload = response.json()
-    print(payload)
-    assert payload["detail"] == messages.INVALID_EMAIL
-
-
-def test_reset_password__(client, user):
-    """
-    The test_reset_password__ function tests the reset_password endpoint.
-        It does so by sending a POST request to /api/auth/reset_password with an email and two passwords, one of which is incorrect.
-        The test asserts that the response status code is 409 (Conflict) and that the payload contains a detail message explaining why.
+    The three structurally identical variants — success, unknown email, and
+    mismatched confirm password — are parametrized; an email of None means
+    "use the registered user's email".
 
     :param client: Make requests to the api
-    :param user: Get the user's email
-    :return: A 409 status code and a message that the passwords do not match
+    :param user: Get the registered user's email
+    :param email: The email to send, or None for the registered one
+    :param confirm_password: The confirm_password field to send
+    :param expected_status: The expected HTTP status code
+    :param key: The payload key to check
+    :param expected: The expected payload value
     :doc-author: Trelent
     """
     response = client.post("/api/auth/reset_password", json={
-        "email": user.get("email"),
+        "email": email or user.get("email"),
         "new_password": "123456",
-        "confirm_password": "123450"
+        "confirm_password": confirm_password
     })
-    assert response.status_code == 409, response.text
+    assert response.status_code == expected_status, response.text
     payload = response.json()
-    print(payload)
-    assert payload["detail"] == messages.PASSWORDS_NOT_EQUAL
+    assert payload[key] == expected
@@ -0,0 +1,49 @@
+import pytest
+from pydantic import ValidationError
+
+from ht_13.src.schemes.contacts import ContactModel, validate_phone_number
+
+
+def test_validate_phone_number_e164_fast_path():
+    """
+    The test_validate_phone_number_e164_fast_path function checks that a
+    well-formed E.164 number is accepted as-is by the regex fast path.
+
+    :return: The unchanged phone number
+    :doc-author: Trelent
+    """
+    assert validate_phone_number("+380501234567") == "+380501234567"
+
+
+def test_validate_phone_number_normalizes():
+    """
+    The test_validate_phone_number_normalizes function checks that a number
+    the regex rejects but phonenumbers can parse is normalized to E.164.
+
+    :return: The phone number in E.164 format
+    :doc-author: Trelent
+    """
+    assert validate_phone_number("+38 (050) 123-45-67") == "+380501234567"
+
+
+@pytest.mark.parametrize("value", ["0000000000", "not-a-phone"])
+def test_contact_model_unparseable_phone(value):
+    """
+    The test_contact_model_unparseable_phone function checks that a phone
+    number phonenumbers cannot even parse surfaces as a pydantic validation
+    error (a 422 at the route level) rather than escaping as a server error.
+
+    :param value: The unparseable phone number to try
+    :return: A ValidationError mentioning the phone_number field
+    :doc-author: Trelent
+    """
+    with pytest.raises(ValidationError) as exc_info:
+        ContactModel(
+            first_name="dead",
+            last_name="deadpool",
+            email="deadpool@example.com",
+            phone_number=value,
+            birth_date="2000-01-01",
+            notes="",
+        )
+    assert exc_info.value.errors()[0]["loc"] == ("phone_number",)